@@ -1,46 +1,153 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, request, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS, cross_origin
+from werkzeug.exceptions import HTTPException
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from azure.cosmos.documents import ConnectionPolicy
+from azure.core import MatchConditions
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.core.pipeline.transport import RequestsTransport
+from auth0 import rest as auth0_rest
+from auth0.exceptions import Auth0Error
 from auth0.management import Auth0
+import orjson
+from cachetools import TTLCache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import atexit
+import hashlib
+import itertools
 import logging
+import math
+import queue
+import re
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
 
 # --- Logging Configuration ---
-dictConfig({
-    'version': 1,
-    'formatters': {'default': {
-        'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
-    }},
-    'handlers': {
+# INFO by default; set LOG_LEVEL=DEBUG to see which fields each request carried. Logs go to stdout for the
+# platform's log collector; set LOG_FILE to also write a rotating file.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE")
+
+# Request threads only enqueue records; a background listener does the console/file I/O
+_log_listener = None
+
+def init_logging():
+    if _log_listener is not None:
+        return
+    handlers = {
         'console': {
             'class': 'logging.StreamHandler',
-            'stream': 'ext://flask.logging.wsgi_errors_stream',
+            'stream': 'ext://sys.stdout',
             'formatter': 'default'
-        },
-        'file': {
+        }
+    }
+    if LOG_FILE:
+        handlers['file'] = {
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': 'logging.log',
+            'filename': LOG_FILE,
             'maxBytes': 1000000,
             'backupCount': 6,
             'formatter': 'default'
         }
-    },
-    'root': {
-        'level': 'DEBUG',
-        'handlers': ['console', 'file']
-    }
-})
-
-app = Flask(__name__)
-CORS(app)
+    dictConfig({
+        'version': 1,
+        # Imported inside the gunicorn master (preload); keep gunicorn's own loggers enabled
+        'disable_existing_loggers': False,
+        'formatters': {'default': {
+            'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
+        }},
+        'handlers': handlers,
+        # azure-core's HTTP logging policy logs every Cosmos request/response's headers at INFO
+        'loggers': {'azure': {'level': 'WARNING'}},
+        'root': {
+            'level': LOG_LEVEL,
+            'handlers': list(handlers)
+        }
+    })
+    start_log_listener()
+    atexit.register(stop_log_listener)
+
+# Emails, secrets and bearer tokens can reach log messages through Auth0/GitHub error text;
+# scrub them before a record is queued
+_REDACT_PATTERNS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    # An optional auth scheme word (Bearer, token, Basic) is masked with the credential;
+    # the value stops at quotes, whitespace, "," "}" and the next "&" query parameter
+    (re.compile(r"(['\"]?(?:client_secret|authorization)['\"]?\s*[:=]\s*['\"]?)(?:\w+\s+)?[^\s'\",}&]+",
+                re.IGNORECASE), r"\1<redacted>"),
+)
+
+def _redact(text):
+    for pattern, replacement in _REDACT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+class RedactFilter(logging.Filter):
+    """Masks emails, client secrets and Authorization values in messages and tracebacks."""
+
+    def filter(self, record):
+        # Filters run outside Handler.emit's handleError guard, so a bad format call must
+        # not raise into the caller; leave the record as is for the handler to report
+        try:
+            message = record.getMessage()
+        except Exception:
+            return True
+        record.msg = _redact(message)
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = _redact(record.exc_text)
+        return True
+
+def start_log_listener():
+    global _log_listener
+    root = logging.getLogger()
+    handlers = list(_log_listener.handlers) if _log_listener else root.handlers[:]
+    log_queue = queue.SimpleQueue()
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RedactFilter())
+    root.handlers = [queue_handler]
+    _log_listener.start()
+
+def stop_log_listener():
+    if _log_listener:
+        _log_listener.stop()
+
+class ORJSONProvider(JSONProvider):
+    """Routes Flask's JSON handling, including request.get_json(), through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+api = Blueprint("api", __name__, cli_group=None)
 
 # Environment variables (dummy defaults for local dev)
 COSMOS_DB_URL = os.getenv("COSMOS_DB_URL", "https://dummy.documents.azure.com:443/")
 COSMOS_DB_KEY = os.getenv("COSMOS_DB_KEY", "dummy-key") 
 DATABASE_NAME = os.getenv("DATABASE_NAME", "testdb")
 CONTAINER_NAME = os.getenv("CONTAINER_NAME", "testcontainer")
+# Clients may only weaken the account's consistency, so leave unset to use the account default
+# (e.g. COSMOS_CONSISTENCY_LEVEL=Session on a Strong or Bounded Staleness account)
+COSMOS_CONSISTENCY_LEVEL = os.getenv("COSMOS_CONSISTENCY_LEVEL") or None
+# /retrieve/<id> falls back to a cross-partition TenantId query when the point read misses;
+# set RETRIEVE_BY_TENANT=0 once every tenant document is stored with id == TenantId
+RETRIEVE_BY_TENANT = os.getenv("RETRIEVE_BY_TENANT", "1") != "0"
 
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "dev-abc123.auth0.com")
 AUTH0_M2M_CLIENT_ID = os.getenv("AUTH0_M2M_CLIENT_ID", "dummy_client_id")
@@ -50,72 +157,314 @@ AUTH0_CONNECTION_ID = os.getenv("AUTH0_CONNECTION_ID", "con_123456")
 GITHUB_PAT = os.getenv("GITHUB_PAT", "ghp_dummyPAT")
 GITHUB_OWNER = os.getenv("GITHUB_OWNER", "dummy-owner")
 
-def get_cosmos_container():
-    app.logger.debug("Connecting to Cosmos DB")
-    client = CosmosClient(COSMOS_DB_URL, COSMOS_DB_KEY)
-    database = client.create_database_if_not_exists(id=DATABASE_NAME)
-    container = database.create_container_if_not_exists(
+# Fail at startup rather than serving 500s on the first request
+_missing_config = [name for name in (
+    "AUTH0_DOMAIN", "AUTH0_M2M_CLIENT_ID", "AUTH0_M2M_CLIENT_SECRET", "AUTH0_CONNECTION_ID",
+    "GITHUB_PAT", "GITHUB_OWNER"
+) if not globals()[name]]
+if _missing_config:
+    raise RuntimeError(f"Missing required configuration: {', '.join(_missing_config)}")
+
+AUTH0_TOKEN_URL = f"https://{AUTH0_DOMAIN}/oauth/token"
+AUTH0_AUDIENCE = f"https://{AUTH0_DOMAIN}/api/v2/"
+GITHUB_URL_TEMPLATE = f"https://api.github.com/repos/{GITHUB_OWNER}/{{repo}}/actions/workflows/{{workflow_id}}/dispatches"
+GITHUB_HEADERS = {
+    "Authorization": f"Bearer {GITHUB_PAT}",
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28"
+}
+
+# /createApp defaults for local development
+DEFAULT_INITIATE_LOGIN_URI = "http://localhost:3000"
+DEFAULT_CALLBACK_URL = "http://localhost:3000/callback"
+DEFAULT_LOGOUT_URL = "http://localhost:3000/logout"
+
+# /retrieve-all pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Items fetched per Cosmos round trip while streaming the unpaged response: bounds the
+# memory held per page without multiplying round trips on large containers
+STREAM_PAGE_SIZE = 500
+
+# Short-lived cache of the full /retrieve-all body so repeated polling does not rescan the container.
+# Bodies above the size cap are streamed instead; the cache then remembers "too large" for the TTL.
+RETRIEVE_ALL_CACHE_TTL = 5
+RETRIEVE_ALL_CACHE_KEY = "all"
+RETRIEVE_ALL_CACHE_MAX_BYTES = int(os.getenv("RETRIEVE_ALL_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+RETRIEVE_ALL_TOO_LARGE = (None, None)
+# Seconds a cache miss waits for another thread's refill before scanning on its own
+RETRIEVE_ALL_FILL_WAIT = 10
+_retrieve_all_cache = TTLCache(maxsize=1, ttl=RETRIEVE_ALL_CACHE_TTL)
+_retrieve_all_lock = threading.RLock()
+# Held by the one thread refilling the cache so concurrent misses do not each scan the container
+_retrieve_all_fill_lock = threading.Lock()
+# Bumped by every write; a scan that started before the bump is not cached
+_retrieve_all_generation = 0
+
+# /retrieve-batch point reads per request
+MAX_BATCH_IDS = 100
+
+# Let browsers reuse a tenant document briefly; after that they revalidate with If-None-Match
+RETRIEVE_CACHE_CONTROL = "private, max-age=5"
+
+# Cosmos DB partial document update limit
+MAX_PATCH_OPERATIONS = 10
+
+# Cosmos DB retries, bounded so a request finishes within about a minute:
+# - 429s are retried by the SDK's throttling policy honouring x-ms-retry-after-ms, for up to
+#   COSMOS_RETRY_TOTAL attempts and COSMOS_RETRY_BACKOFF_MAX seconds of waiting in total.
+# - 449/500/503 and connection errors are retried by the transport-level policy:
+#   COSMOS_TRANSPORT_RETRIES retries with 0.5s/1s/2s back-off, each attempt limited to
+#   COSMOS_REQUEST_TIMEOUT seconds (the SDK default is 60s per attempt).
+COSMOS_RETRY_TOTAL = 9
+COSMOS_RETRY_BACKOFF_MAX = 20
+COSMOS_TRANSPORT_RETRIES = 3
+COSMOS_TRANSPORT_BACKOFF_FACTOR = 0.5
+COSMOS_REQUEST_TIMEOUT = 8
+COSMOS_RETRY_STATUS_CODES = [449, 500, 503]
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype="application/json")
+
+def ojsonify(obj, status=200):
+    return json_response(orjson.dumps(obj), status)
+
+# Organization slug: lowercase ASCII letters and spaces to hyphens in a single pass
+_ORG_TABLE = str.maketrans({c: c.lower() for c in string.ascii_uppercase} | {" ": "-"})
+
+# Fixed error bodies are serialized once. The Response objects are still built per
+# request because after_request hooks (flask-cors) add headers to them.
+ERR_DB = orjson.dumps({"error": "Database error"})
+ERR_DB_UNAVAILABLE = orjson.dumps({"error": "Database unavailable"})
+ERR_NOT_FOUND = orjson.dumps({"error": "Item not found"})
+ERR_INVALID_BODY = orjson.dumps({"error": "Invalid input. JSON object body is required."})
+ERR_PRECONDITION_FAILED = orjson.dumps({"error": "Item was modified by another request"})
+ERR_UPSTREAM = orjson.dumps({"error": "Connection to upstream service failed"})
+ERR_INTERNAL = orjson.dumps({"error": "Internal server error"})
+
+# Connection pools: pool_connections is the number of hosts kept pooled per session and
+# pool_maxsize the keep-alive connections per host. The default of 10 is below the number
+# of request threads a worker runs, which forces fresh handshakes under concurrent load.
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 128
+# Request threads per worker; read from the same variable gunicorn.conf.py uses
+REQUEST_THREADS = int(os.getenv("GUNICORN_THREADS", 16))
+# /retrieve-batch point reads in flight per worker, shared by all request threads
+COSMOS_FANOUT_THREADS = 2 * REQUEST_THREADS
+# Keep-alive connections per Cosmos endpoint, per worker: one per request thread plus one per
+# /retrieve-batch fan-out thread; raise it if "Connection pool is full" warnings appear.
+COSMOS_POOL_MAXSIZE = int(os.getenv("COSMOS_POOL_MAXSIZE", REQUEST_THREADS + COSMOS_FANOUT_THREADS))
+
+def throttled_response(e):
+    """503 for a request Cosmos still throttled after the SDK's own retries, passing on its back-off."""
+    logger.warning("Cosmos DB throttled request after retries: %s", e)
+    retry_after_ms = float(e.headers.get("x-ms-retry-after-ms") or 1000)
+    response = ojsonify({"error": "Database busy, retry later"}, 503)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after_ms / 1000)))
+    return response
+
+def _build_session(max_retries=None, pool_maxsize=HTTP_POOL_MAXSIZE):
+    if max_retries is None:
+        # 429s are left to auth0-python's own rate-limit handling. raise_on_status=False
+        # hands the final response back so callers still see the status code
+        max_retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                            raise_on_status=False)
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        pool_block=False,
+        max_retries=max_retries
+    )
+    session.mount("https://", adapter)
+    return session
+
+# One long-lived session keeps a per-host pool of TCP/TLS connections to Auth0 and GitHub
+_http_session = _build_session()
+
+# Runs independent Auth0 management calls in parallel. Every request thread may have one
+# call in flight here, so the pool matches the thread count rather than queueing requests
+# behind each other's calls.
+_auth0_executor = ThreadPoolExecutor(max_workers=REQUEST_THREADS)
+# Fans out Cosmos point reads for /retrieve-batch
+_cosmos_executor = ThreadPoolExecutor(max_workers=COSMOS_FANOUT_THREADS)
+
+def create_cosmos_client():
+    # The Python SDK only supports Gateway mode (documents.ConnectionMode has no Direct),
+    # so latency is kept down by reusing pooled gateway connections instead.
+    # The Cosmos SDK runs its own retry policy, so the transport adapter must not retry
+    session = _build_session(Retry(total=False, redirect=False, raise_on_status=False),
+                             pool_maxsize=COSMOS_POOL_MAXSIZE)
+    # retry_total/retry_backoff_max would also size the transport retries (9 retries backing
+    # off up to 30s each), so those get their own, shorter policy
+    connection_policy = ConnectionPolicy()
+    connection_policy.ConnectionRetryConfiguration = Retry(
+        total=COSMOS_TRANSPORT_RETRIES,
+        backoff_factor=COSMOS_TRANSPORT_BACKOFF_FACTOR,
+        status_forcelist=COSMOS_RETRY_STATUS_CODES
+    )
+    return CosmosClient(COSMOS_DB_URL, COSMOS_DB_KEY,
+                        consistency_level=COSMOS_CONSISTENCY_LEVEL,
+                        transport=RequestsTransport(session=session),
+                        connection_policy=connection_policy,
+                        connection_timeout=COSMOS_REQUEST_TIMEOUT,
+                        retry_total=COSMOS_RETRY_TOTAL,
+                        retry_backoff_max=COSMOS_RETRY_BACKOFF_MAX)
+
+def provision_cosmos():
+    """Create the database and container if missing.
+
+    These are control-plane calls, so they run once at startup (gunicorn's on_starting
+    hook or ``flask --app app provision-cosmos``) rather than on the request path.
+    """
+    logger.info("Provisioning Cosmos DB database %s / container %s", DATABASE_NAME, CONTAINER_NAME)
+    database = create_cosmos_client().create_database_if_not_exists(id=DATABASE_NAME)
+    database.create_container_if_not_exists(
         id=CONTAINER_NAME,
         partition_key=PartitionKey(path="/id"),
         offer_throughput=400
     )
-    app.logger.debug("Cosmos container ready")
-    return container
+
+@api.cli.command("provision-cosmos")
+def provision_cosmos_command():
+    provision_cosmos()
+
+# One CosmosClient per process: it owns the connection pool, so it must be
+# long-lived. Built lazily so each gunicorn worker creates its own after fork.
+_container = None
+_container_lock = threading.Lock()
+
+def get_cosmos_container():
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                logger.debug("Connecting to Cosmos DB")
+                # get_*_client only builds proxies; no metadata round trips
+                _container = create_cosmos_client().get_database_client(DATABASE_NAME) \
+                    .get_container_client(CONTAINER_NAME)
+                logger.debug("Cosmos container ready")
+    return _container
+
+def _auth0_request(method, url, **kwargs):
+    return _http_session.request(method, url, **kwargs)
+
+# auth0-python 4.x issues every management call through the module-level requests.request()
+# and takes no session argument, so route it through the pooled session instead
+auth0_rest.requests = SimpleNamespace(request=_auth0_request)
+
+# Management API tokens are valid for ~24h; mint one and reuse it until shortly before expiry.
+# Expiry is tracked on the monotonic clock so wall-clock adjustments cannot extend a token.
+AUTH0_TOKEN_REFRESH_MARGIN = 60
+_auth0_cache = {"client": None, "expires_at": 0.0}
+_auth0_lock = threading.Lock()
 
 def get_auth0_client():
-    try:
-        app.logger.info("Requesting Auth0 M2M token")
-        token_response = requests.post(
-            f"https://{AUTH0_DOMAIN}/oauth/token",
-            json={
-                "client_id": AUTH0_M2M_CLIENT_ID,
-                "client_secret": AUTH0_M2M_CLIENT_SECRET,
-                "audience": f"https://{AUTH0_DOMAIN}/api/v2/",
-                "grant_type": "client_credentials"
-            },
-            timeout=10
-        )
-        token_response.raise_for_status()
-        app.logger.info("Auth0 M2M token acquired")
-        return Auth0(AUTH0_DOMAIN, token_response.json()["access_token"])
-    except Exception as e:
-        app.logger.error(f"Failed to get Auth0 client: {e}", exc_info=True)
-        raise
+    if time.monotonic() < _auth0_cache["expires_at"]:
+        return _auth0_cache["client"]
+    with _auth0_lock:
+        if time.monotonic() < _auth0_cache["expires_at"]:
+            return _auth0_cache["client"]
+        try:
+            logger.info("Requesting Auth0 M2M token")
+            token_response = _http_session.post(
+                AUTH0_TOKEN_URL,
+                json={
+                    "client_id": AUTH0_M2M_CLIENT_ID,
+                    "client_secret": AUTH0_M2M_CLIENT_SECRET,
+                    "audience": AUTH0_AUDIENCE,
+                    "grant_type": "client_credentials"
+                },
+                timeout=10
+            )
+            token_response.raise_for_status()
+            token = token_response.json()
+            logger.info("Auth0 M2M token acquired")
+            _auth0_cache["client"] = Auth0(AUTH0_DOMAIN, token["access_token"])
+            _auth0_cache["expires_at"] = (time.monotonic() + token.get("expires_in", 0)
+                                          - AUTH0_TOKEN_REFRESH_MARGIN)
+            return _auth0_cache["client"]
+        except Exception as e:
+            logger.error("Failed to get Auth0 client: %s", e, exc_info=True)
+            raise
+
+def reset_connections():
+    """Drop clients, pools and locks inherited across fork() so this process opens its own sockets."""
+    global _container, _container_lock, _auth0_lock, _auth0_executor, _cosmos_executor
+    global _http_session
+    _container = None
+    _container_lock = threading.Lock()
+    _auth0_cache.update(client=None, expires_at=0.0)
+    _auth0_lock = threading.Lock()
+    _auth0_executor = ThreadPoolExecutor(max_workers=REQUEST_THREADS)
+    _cosmos_executor = ThreadPoolExecutor(max_workers=COSMOS_FANOUT_THREADS)
+    _http_session = _build_session()
 
 def ensure_list(param):
-    if param is None:
-        return []
-    if isinstance(param, list):
+    if type(param) is list:
         return param
-    return [param]
-
-@app.route('/createApp', methods=['POST'])
+    return [] if param is None else [param]
+
+def rollback_auth0_app(auth0, client_id, org_id):
+    """Best-effort removal of what a failed /createApp call already created in Auth0."""
+    # Runs inline on the failing request's thread rather than on _auth0_executor, so
+    # cleanup never waits behind other requests' Auth0 calls
+    if client_id:
+        try:
+            auth0.clients.delete(client_id)
+            logger.warning("Rolled back client %s", client_id)
+        except Exception:
+            logger.error("Failed to roll back client %s", client_id, exc_info=True)
+    if org_id:
+        try:
+            auth0.organizations.delete_organization(org_id)
+            logger.warning("Rolled back organization %s", org_id)
+        except Exception:
+            logger.error("Failed to roll back organization %s", org_id, exc_info=True)
+
+@api.route('/createApp', methods=['POST'])
 @cross_origin()
 def create_auth0_app():
-    app.logger.info("POST /createApp called")
+    logger.info("POST /createApp called")
+    data = request.get_json(silent=True, cache=False)
+    if not isinstance(data, dict):
+        logger.warning("Invalid or missing JSON body for createApp")
+        return json_response(ERR_INVALID_BODY, 400)
+    logger.debug("createApp fields: %s", list(data))
+    app_name = data.get('app')
+    org_name = data.get('org_name')
+    email = data.get('email')
+    
+    # Set critical defaults
+    initiate_login_uri = data.get('initiate_login_uri', DEFAULT_INITIATE_LOGIN_URI)
+    callback_urls = ensure_list(data.get('callback_urls', DEFAULT_CALLBACK_URL))
+    logout_urls = ensure_list(data.get('logout_urls', DEFAULT_LOGOUT_URL))
+
+    logger.info('Creating app "%s" for org "%s" (invitee email given: %s)', app_name, org_name, bool(email))
+
+    # Validate all required parameters
+    missing = [name for name, value in (('app', app_name), ('org_name', org_name),
+                                        ('email', email), ('initiate_login_uri', initiate_login_uri))
+               if not value]
+    if missing:
+        logger.error('Missing required parameters: %s', missing)
+        return ojsonify({"error": f"Missing required fields: {', '.join(missing)}"}, 400)
+
+    auth0 = get_auth0_client()
+
+    # 2. Create Organization with the connection enabled in the same call -- independent
+    # of the client, so run it alongside step 1
+    org_future = _auth0_executor.submit(auth0.organizations.create_organization, {
+        "name": org_name.translate(_ORG_TABLE),
+        "display_name": org_name,
+        "enabled_connections": [{
+            "connection_id": AUTH0_CONNECTION_ID,
+            "assign_membership_on_login": True
+        }]
+    })
+
+    auth0_app = org = None
     try:
-        data = request.get_json()
-        app.logger.debug(f"Request data: {data}")
-        app_name = data.get('app')
-        org_name = data.get('org_name')
-        email = data.get('email')
-        
-        # Set critical defaults
-        initiate_login_uri = data.get('initiate_login_uri', "http://localhost:3000")
-        callback_urls = ensure_list(data.get('callback_urls', "http://localhost:3000/callback"))
-        logout_urls = ensure_list(data.get('logout_urls', "http://localhost:3000/logout"))
-
-        app.logger.info(f'Creating app "{app_name}" for org "{org_name}"')
-
-        # Validate all required parameters
-        if not all([app_name, org_name, email, initiate_login_uri]):
-            missing = [k for k, v in {'app': app_name, 'org_name': org_name,
-                                    'email': email, 'initiate_login_uri': initiate_login_uri}.items() if not v]
-            app.logger.error(f'Missing required parameters: {missing}')
-            return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
-
-        auth0 = get_auth0_client()
-
         # 1. Create Auth0 client with OIDC compliance and org enforcement
         auth0_app = auth0.clients.create({
             "name": app_name,
@@ -128,26 +477,12 @@ def create_auth0_app():
             "oidc_conformant": True,
             "token_endpoint_auth_method": "none"
         })
-        app.logger.info(f'Created OIDC-compliant client {auth0_app["client_id"]}')
+        logger.info('Created OIDC-compliant client %s', auth0_app["client_id"])
 
-        # 2. Create Organization
-        org = auth0.organizations.create_organization({
-            "name": org_name.lower().replace(" ", "-"),
-            "display_name": org_name
-        })
-        app.logger.info(f'Created organization {org["id"]}')
-
-        # 3. Enable connection for organization
-        auth0.organizations.create_organization_connection(
-            org["id"],
-            {
-                "connection_id": AUTH0_CONNECTION_ID,
-                "assign_membership_on_login": True
-            }
-        )
-        app.logger.info(f'Connected {AUTH0_CONNECTION_ID} to organization {org["id"]}')
+        org = org_future.result()
+        logger.info('Created organization %s with connection %s', org["id"], AUTH0_CONNECTION_ID)
 
-        # 4. Send invitation
+        # 3. Send invitation
         invitation = auth0.organizations.create_organization_invitation(
             org["id"],
             {
@@ -157,193 +492,384 @@ def create_auth0_app():
                 "send_invitation_email": True
             }
         )
-        app.logger.info(f'Sent invitation to {email}')
+        logger.info('Sent invitation for organization %s', org["id"])
+    except Exception:
+        # Wait for the organization call if it is still running so it can be undone too
+        if org is None and org_future.exception() is None:
+            org = org_future.result()
+        rollback_auth0_app(auth0,
+                           auth0_app["client_id"] if auth0_app else None,
+                           org["id"] if org else None)
+        raise
 
-        # --- Add Okta domain and callback URLs to response ---
-        okta_domain = AUTH0_DOMAIN  # <-- Replace with your actual Okta domain
+    # --- Add Okta domain and callback URLs to response ---
+    okta_domain = AUTH0_DOMAIN  # <-- Replace with your actual Okta domain
 
-        return jsonify({
-            "client_id": auth0_app["client_id"],
-            "org_id": org["id"],
-            "initiate_login_uri": initiate_login_uri,
-            "oidc_conformant": True,
-            "okta_domain": okta_domain,
-            "callback_urls": callback_urls
-        }), 201
-
-    except Exception as e:
-        app.logger.error(f'Critical error in /createApp: {str(e)}', exc_info=True)
-        return jsonify({
-            "error": "Application creation failed",
-            "details": str(e)
-        }), 500
-
-@app.route('/write', methods=['POST'])
+    return ojsonify({
+        "client_id": auth0_app["client_id"],
+        "org_id": org["id"],
+        "initiate_login_uri": initiate_login_uri,
+        "oidc_conformant": True,
+        "okta_domain": okta_domain,
+        "callback_urls": callback_urls
+    }, 201)
+
+@api.route('/write', methods=['POST'])
 @cross_origin()
 def write_or_update_data():
-    app.logger.info("POST /write called")
+    logger.info("POST /write called")
+    data = request.get_json(silent=True, cache=False)
+    if not isinstance(data, dict) or not isinstance(data.get('id'), str):
+        logger.warning("Invalid data for write: missing 'id'")
+        return ojsonify({"error": "Invalid data. 'id' is required and must be a string."}, 400)
+    logger.debug("Write fields for %s: %s", data['id'], list(data))
+
+    container = get_cosmos_container()
+    # Upserts are deliberately not coalesced into execute_item_batch: a transactional batch
+    # must share one partition key, and with /id as the key every document is its own
+    # partition, so a batch could only ever hold writes to the same id.
+    container.upsert_item(body=data)
+    invalidate_retrieve_all()
+    logger.info("Data written/updated for id: %s", data['id'])
+    return ojsonify({"message": "Data written or updated successfully"}, 201)
+
+def read_item_or_none(container, item_id):
     try:
-        data = request.get_json()
-        app.logger.debug(f"Write data: {data}")
-        if not data or 'id' not in data:
-            app.logger.warning("Invalid data for write: missing 'id'")
-            return jsonify({"error": "Invalid data. 'id' is required."}), 400
-
-        container = get_cosmos_container()
-        container.upsert_item(body=data)
-        app.logger.info(f"Data written/updated for id: {data['id']}")
-        return jsonify({"message": "Data written or updated successfully"}), 201
-    except exceptions.CosmosHttpResponseError as e:
-        app.logger.error(f"Cosmos DB error: {e}", exc_info=True)
-        return jsonify({"error": "Database error"}), 500
-
-@app.route('/retrieve/<tenant_id>', methods=['GET'])
+        return container.read_item(item=item_id, partition_key=item_id)
+    except exceptions.CosmosResourceNotFoundError:
+        return None
+
+def not_modified(etag):
+    return Response(status=304, headers={"ETag": etag, "Cache-Control": RETRIEVE_CACHE_CONTROL})
+
+@api.route('/retrieve/<tenant_id>', methods=['GET'])
 @cross_origin()
 def retrieve_data(tenant_id):
+    container = get_cosmos_container()
+    etag = request.headers.get('If-None-Match')
+
+    # Tenant documents are normally stored with id == TenantId, so try a point read (~1 RU) first.
+    # With If-None-Match, Cosmos answers an unchanged document with an empty 304 instead of the body.
+    condition = {"etag": etag, "match_condition": MatchConditions.IfModified} if etag else {}
     try:
-        container = get_cosmos_container()
-        query = "SELECT * FROM c WHERE c.TenantId = @tenant_id"
+        item = container.read_item(item=tenant_id, partition_key=tenant_id, **condition)
+    except exceptions.CosmosResourceNotFoundError:
+        item = None
+    else:
+        if not item:
+            return not_modified(etag)
+    if RETRIEVE_BY_TENANT and (item is None or item.get("TenantId") != tenant_id):
+        # Fall back to the cross-partition query for documents keyed differently, stopping
+        # at the first match instead of materializing all of them
+        query = "SELECT * FROM c WHERE c.TenantId = @tenant_id OFFSET 0 LIMIT 1"
         parameters = [{"name": "@tenant_id", "value": tenant_id}]
-
-        items = list(container.query_items(
+        item = next(iter(container.query_items(
             query=query,
             parameters=parameters,
             enable_cross_partition_query=True
-        ))
-
-        if not items:
-            return jsonify({"error": "Item not found"}), 404
-
-        return jsonify(items[0]), 200
-
-    except exceptions.CosmosHttpResponseError as e:
-        return jsonify({"error": "Database error", "details": str(e)}), 500
-    except Exception as e:
-        return jsonify({"error": "Unexpected error", "details": str(e)}), 500
-
-@app.route('/retrieve-all', methods=['GET'])
+        )), None)
+
+    if item is None:
+        return json_response(ERR_NOT_FOUND, 404)
+    if etag and item.get("_etag") == etag:
+        return not_modified(etag)
+
+    response = ojsonify(item, 200)
+    response.headers["ETag"] = item["_etag"]
+    response.headers["Cache-Control"] = RETRIEVE_CACHE_CONTROL
+    return response
+
+def stream_json_array(first, rest):
+    """Yield a JSON array one item at a time so the full result set is never buffered."""
+    count = 0
+    yield b'['
+    if first is not None:
+        yield orjson.dumps(first)
+        count = 1
+        for item in rest:
+            yield b','
+            yield orjson.dumps(item)
+            count += 1
+    yield b']'
+    logger.info("Retrieved all items. Count: %s", count)
+
+def scan_all_items(container, query):
+    items = iter(container.query_items(
+        query=query,
+        max_item_count=STREAM_PAGE_SIZE,
+        enable_cross_partition_query=True
+    ))
+    # Pull the first page up front so query errors still map to a 500
+    first = next(items, None)
+    return stream_json_array(first, items)
+
+def store_retrieve_all(entry, generation):
+    with _retrieve_all_lock:
+        if generation == _retrieve_all_generation:
+            _retrieve_all_cache[RETRIEVE_ALL_CACHE_KEY] = entry
+
+def fill_retrieve_all(container, query):
+    """Scan the container into the cache, buffering at most RETRIEVE_ALL_CACHE_MAX_BYTES.
+
+    Returns (entry, None) when the body fits, or (None, chunks) to stream when it does not.
+    """
+    generation = _retrieve_all_generation
+    chunks = scan_all_items(container, query)
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size > RETRIEVE_ALL_CACHE_MAX_BYTES:
+            store_retrieve_all(RETRIEVE_ALL_TOO_LARGE, generation)
+            return None, itertools.chain(buffered, chunks)
+    body = b"".join(buffered)
+    entry = (body, hashlib.blake2b(body, digest_size=8).hexdigest())
+    store_retrieve_all(entry, generation)
+    return entry, None
+
+def invalidate_retrieve_all():
+    global _retrieve_all_generation
+    with _retrieve_all_lock:
+        _retrieve_all_generation += 1
+        _retrieve_all_cache.clear()
+
+# Cross-partition scan of the whole container: cost grows with container size.
+# Prefer /retrieve/<id> or /retrieve-batch (point reads, ~1 RU each), or page with ?page_size=.
+@api.route('/retrieve-all', methods=['GET'])
 @cross_origin()
 def retrieve_all():
-    app.logger.info("GET /retrieve-all called")
-    try:
-        container = get_cosmos_container()
-        query = "SELECT * FROM c"
-        items = list(container.query_items(
-            query=query,
-            enable_cross_partition_query=True
-        ))
-        app.logger.info(f"Retrieved all items. Count: {len(items)}")
-        return jsonify(items), 200
-    except exceptions.CosmosHttpResponseError as e:
-        app.logger.error(f"Cosmos DB error: {e}", exc_info=True)
-        return jsonify({"error": "Database error"}), 500
-
-@app.route('/delete/<id>', methods=['DELETE'])
+    logger.info("GET /retrieve-all called")
+    page_size = request.args.get('page_size')
+    if page_size is not None:
+        # type=int would turn a bad value into None and fall through to the full scan
+        try:
+            page_size = int(page_size)
+        except ValueError:
+            return ojsonify({"error": "page_size must be an integer"}, 400)
+    continuation = request.args.get('continuation')
+    container = get_cosmos_container()
+    query = "SELECT * FROM c"
+
+    if page_size is None and continuation is None:
+        with _retrieve_all_lock:
+            entry = _retrieve_all_cache.get(RETRIEVE_ALL_CACHE_KEY)
+        chunks = None
+        if entry is None and _retrieve_all_fill_lock.acquire(timeout=RETRIEVE_ALL_FILL_WAIT):
+            try:
+                # Another thread may have refilled the cache while this one waited
+                with _retrieve_all_lock:
+                    entry = _retrieve_all_cache.get(RETRIEVE_ALL_CACHE_KEY)
+                if entry is None:
+                    entry, chunks = fill_retrieve_all(container, query)
+            finally:
+                _retrieve_all_fill_lock.release()
+
+        if entry is not None and entry is not RETRIEVE_ALL_TOO_LARGE:
+            body, etag = entry
+            response = json_response(body, 200)
+            response.set_etag(etag)
+            return response.make_conditional(request)
+
+        if chunks is None:
+            chunks = scan_all_items(container, query)
+        return Response(stream_with_context(chunks), mimetype='application/json')
+
+    page_size = min(max(page_size or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    pager = container.query_items(
+        query=query,
+        max_item_count=page_size,
+        enable_cross_partition_query=True
+    ).by_page(continuation)
+    items = list(next(pager, []))
+    logger.info("Retrieved page of items. Count: %s", len(items))
+    return ojsonify({"items": items, "continuation": pager.continuation_token}, 200)
+
+@api.route('/retrieve-batch', methods=['GET'])
+@cross_origin()
+def retrieve_batch():
+    logger.info("GET /retrieve-batch called")
+    ids = list(dict.fromkeys(i for i in request.args.get('ids', '').split(',') if i))
+    if not ids:
+        return ojsonify({"error": "Missing required parameter: ids"}, 400)
+    if len(ids) > MAX_BATCH_IDS:
+        return ojsonify({"error": f"At most {MAX_BATCH_IDS} ids per request"}, 400)
+    container = get_cosmos_container()
+    results = _cosmos_executor.map(lambda item_id: read_item_or_none(container, item_id), ids)
+    items = []
+    missing = []
+    for item_id, item in zip(ids, results):
+        if item is None:
+            missing.append(item_id)
+        else:
+            items.append(item)
+    logger.info("Retrieved batch. Found: %s, missing: %s", len(items), len(missing))
+    return ojsonify({"items": items, "missing": missing}, 200)
+
+@api.route('/delete/<id>', methods=['DELETE'])
 @cross_origin()
 def delete_data(id):
-    app.logger.info(f"DELETE /delete/{id} called")
-    try:
-        container = get_cosmos_container()
-        container.delete_item(item=id, partition_key=id)
-        app.logger.info(f"Item deleted: {id}")
-        return jsonify({"message": "Data deleted successfully"}), 200
-    except exceptions.CosmosResourceNotFoundError:
-        app.logger.warning(f"Item not found for delete: {id}")
-        return jsonify({"error": "Item not found"}), 404
-    except exceptions.CosmosHttpResponseError as e:
-        app.logger.error(f"Cosmos DB error: {e}", exc_info=True)
-        return jsonify({"error": "Database error"}), 500
-
-@app.route('/edit/<id>', methods=['PUT'])
+    logger.info("DELETE /delete/%s called", id)
+    container = get_cosmos_container()
+    container.delete_item(item=id, partition_key=id)
+    invalidate_retrieve_all()
+    logger.info("Item deleted: %s", id)
+    return ojsonify({"message": "Data deleted successfully"}, 200)
+
+def editable_fields(updated_data):
+    """Drop id and system properties: neither a patch nor a replace may change them."""
+    return {key: value for key, value in updated_data.items() if key != "id" and not key.startswith("_")}
+
+def build_patch_operations(fields):
+    """Turn editable fields into Cosmos "set" operations."""
+    return [
+        {"op": "set", "path": "/" + key.replace("~", "~0").replace("/", "~1"), "value": value}
+        for key, value in fields.items()
+    ]
+
+@api.route('/edit/<id>', methods=['PUT'])
 @cross_origin()
 def edit_data(id):
-    app.logger.info(f"PUT /edit/{id} called")
-    try:
-        updated_data = request.get_json()
-        app.logger.debug(f"Edit data for {id}: {updated_data}")
-        if not updated_data:
-            app.logger.warning("No JSON body provided for edit")
-            return jsonify({"error": "Invalid input. JSON body is required."}), 400
-
-        container = get_cosmos_container()
+    logger.info("PUT /edit/%s called", id)
+    updated_data = request.get_json(silent=True, cache=False)
+    if not isinstance(updated_data, dict) or not updated_data:
+        logger.warning("No JSON body provided for edit")
+        return json_response(ERR_INVALID_BODY, 400)
+    logger.debug("Edit fields for %s: %s", id, list(updated_data))
+
+    # Optional optimistic concurrency: only apply the edit if the document still has this ETag
+    etag = request.headers.get('If-Match')
+    condition = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+
+    fields = editable_fields(updated_data)
+    if not fields:
+        logger.warning("No editable fields provided for edit of %s", id)
+        return ojsonify({"error": "No editable fields. 'id' and '_' system properties cannot be changed."}, 400)
+
+    container = get_cosmos_container()
+    if len(fields) <= MAX_PATCH_OPERATIONS:
+        item = container.patch_item(item=id, partition_key=id, patch_operations=build_patch_operations(fields),
+                                    **condition)
+    else:
+        # Cosmos caps a patch at 10 operations; larger edits fall back to read-modify-write
         item = container.read_item(item=id, partition_key=id)
-        item.update(updated_data)
-        container.replace_item(item=item, body=item)
-        app.logger.info(f"Item updated: {id}")
-        return jsonify({"message": "Data updated successfully"}), 200
-    except exceptions.CosmosResourceNotFoundError:
-        app.logger.warning(f"Item not found for edit: {id}")
-        return jsonify({"error": "Item not found"}), 404
-    except exceptions.CosmosHttpResponseError as e:
-        app.logger.error(f"Cosmos DB error: {e}", exc_info=True)
-        return jsonify({"error": "Database error"}), 500
-
-@app.route('/trigger-deploy', methods=['POST'])
+        item.update(fields)
+        item = container.replace_item(item=item, body=item, **condition)
+    invalidate_retrieve_all()
+    logger.info("Item updated: %s", id)
+    response = ojsonify({"message": "Data updated successfully"}, 200)
+    response.headers["ETag"] = item["_etag"]
+    return response
+
+@api.route('/trigger-deploy', methods=['POST'])
 @cross_origin()
 def trigger_deployment():
-    app.logger.info("POST /trigger-deploy called")
-    try:
-        data = request.get_json()
-        app.logger.debug(f"Trigger deploy payload: {data}")
-
-        repo = data.get('repo')
-        workflow_id = data.get('workflow_id')
-        inputs = data.get('inputs', {})
-        
-        app.logger.info(f'GITHUB_OWNER: {GITHUB_OWNER}')
-        app.logger.info(f'GITHUB_PAT: {"***" if GITHUB_PAT else "Not set"}')
-
-        if not repo:
-            app.logger.warning('Missing required parameter: repo')
-            return jsonify({"error": "Missing required parameter: repo"}), 400
-        if not workflow_id:
-            app.logger.warning('Missing required parameter: workflow_id')
-            return jsonify({"error": "Missing required parameter: workflow_id"}), 400
-        if not GITHUB_PAT or not GITHUB_OWNER:
-            app.logger.error('Server misconfiguration detected - missing GITHUB_PAT or GITHUB_OWNER')
-            return jsonify({"error": "Server misconfiguration"}), 500
-
-        url = f"https://api.github.com/repos/{GITHUB_OWNER}/{repo}/actions/workflows/{workflow_id}/dispatches"
-        headers = {
-            "Authorization": f"Bearer {GITHUB_PAT}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
-        payload = {
-            "ref": "main",
-            "inputs": inputs
-        }
-
-        app.logger.info(f'Dispatching workflow to GitHub: {url}')
-        app.logger.debug(f'Request payload: {payload}')
-
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        app.logger.info(f'GitHub API response status: {response.status_code}')
-
-        if response.status_code == 204:
-            app.logger.info('Successfully triggered workflow')
-            return jsonify({
-                "status": "Workflow triggered successfully",
-                "repo": repo,
-                "workflow_id": workflow_id,
-                "inputs": inputs
-            }), 200
-
-        app.logger.error(f'Workflow trigger failed. GitHub response: {response.text}')
-        return jsonify({
-            "error": "Failed to trigger workflow",
+    logger.info("POST /trigger-deploy called")
+    data = request.get_json(silent=True, cache=False)
+    if not isinstance(data, dict):
+        logger.warning("Invalid or missing JSON body for trigger-deploy")
+        return json_response(ERR_INVALID_BODY, 400)
+
+    repo = data.get('repo')
+    workflow_id = data.get('workflow_id')
+    inputs = data.get('inputs', {})
+
+    if not repo:
+        logger.warning('Missing required parameter: repo')
+        return ojsonify({"error": "Missing required parameter: repo"}, 400)
+    if not workflow_id:
+        logger.warning('Missing required parameter: workflow_id')
+        return ojsonify({"error": "Missing required parameter: workflow_id"}, 400)
+
+    url = GITHUB_URL_TEMPLATE.format(repo=repo, workflow_id=workflow_id)
+    payload = {"ref": "main", "inputs": inputs}
+
+    logger.info('Dispatching workflow to GitHub: %s', url)
+    logger.debug('Workflow input fields: %s', list(inputs) if isinstance(inputs, dict) else type(inputs).__name__)
+
+    response = _http_session.post(url, json=payload, headers=GITHUB_HEADERS, timeout=30)
+    logger.info('GitHub API response status: %s', response.status_code)
+
+    if response.status_code == 204:
+        logger.info('Successfully triggered workflow')
+        return ojsonify({
+            "status": "Workflow triggered successfully",
             "repo": repo,
             "workflow_id": workflow_id,
-            "details": response.json().get('message', 'Unknown error')
-        }), response.status_code
-
-    except requests.exceptions.RequestException as e:
-        app.logger.error(f'Network error occurred: {str(e)}', exc_info=True)
-        return jsonify({"error": "Connection to GitHub failed"}), 500
-    except Exception as e:
-        app.logger.error(f'Unexpected error: {str(e)}', exc_info=True)
-        return jsonify({"error": "Internal server error"}), 500
-
-if __name__ == '__main__':
-    app.logger.info("Starting Flask app")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+            "inputs": inputs
+        }, 200)
+
+    logger.error('Workflow trigger failed. GitHub response: %s', response.text)
+    # Proxies in front of GitHub can answer with HTML, so only parse bodies that claim to be JSON
+    details = response.text[:256] or 'Unknown error'
+    if response.headers.get('Content-Type', '').startswith('application/json'):
+        try:
+            parsed = response.json()
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            details = parsed.get('message', 'Unknown error')
+    return ojsonify({
+        "error": "Failed to trigger workflow",
+        "repo": repo,
+        "workflow_id": workflow_id,
+        "details": details
+    }, response.status_code)
+
+@api.app_errorhandler(exceptions.CosmosResourceNotFoundError)
+def handle_item_not_found(e):
+    logger.warning("Item not found: %s %s", request.method, request.path)
+    return json_response(ERR_NOT_FOUND, 404)
+
+@api.app_errorhandler(exceptions.CosmosAccessConditionFailedError)
+def handle_etag_mismatch(e):
+    logger.warning("ETag mismatch: %s %s", request.method, request.path)
+    return json_response(ERR_PRECONDITION_FAILED, 412)
+
+@api.app_errorhandler(exceptions.CosmosHttpResponseError)
+def handle_cosmos_error(e):
+    if e.status_code == 429:
+        return throttled_response(e)
+    if e.status_code == 503:
+        # Still unavailable after the SDK's retries: an upstream outage, not our fault
+        logger.error("Cosmos DB unavailable: %s", e)
+        return json_response(ERR_DB_UNAVAILABLE, 502)
+    logger.error("Cosmos DB error: %s", e, exc_info=True)
+    return json_response(ERR_DB, 500)
+
+@api.app_errorhandler(ServiceRequestError)
+@api.app_errorhandler(ServiceResponseError)
+def handle_cosmos_network_error(e):
+    # DNS, connect and read failures from the Cosmos transport, after the SDK's own retries
+    logger.error("Cosmos DB unreachable: %s", e)
+    return json_response(ERR_DB_UNAVAILABLE, 502)
+
+@api.app_errorhandler(Auth0Error)
+def handle_auth0_error(e):
+    logger.error("Auth0 error: %s", e, exc_info=True)
+    return ojsonify({"error": "Application creation failed", "details": str(e)}, 500)
+
+@api.app_errorhandler(requests.exceptions.RequestException)
+def handle_upstream_error(e):
+    logger.error("Network error occurred: %s", e, exc_info=True)
+    return json_response(ERR_UPSTREAM, 502)
+
+@api.app_errorhandler(Exception)
+def handle_unexpected_error(e):
+    if isinstance(e, HTTPException):
+        return e
+    logger.error("Unexpected error: %s", e, exc_info=True)
+    return json_response(ERR_INTERNAL, 500)
+
+def create_app():
+    app = Flask(__name__)
+    app.json = ORJSONProvider(app)
+    # Reject oversized bodies before they are buffered and parsed
+    app.config["MAX_CONTENT_LENGTH"] = 256 * 1024
+    CORS(app)
+    init_logging()
+    app.register_blueprint(api)
+    return app
+
+# Module-level instance for "gunicorn app:app" (Dockerfile, App Service default startup)
+app = create_app()
@@ -0,0 +1,50 @@
+# Gunicorn configuration, picked up automatically from the working directory:
+#   gunicorn app:app
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Every route is I/O-bound (Cosmos, Auth0, GitHub), so run many threads per worker. The
+# Cosmos (4.6 sync transport) and Auth0 SDKs are blocking, so an ASGI port would still push
+# them onto threads; a thread waiting on a socket costs little beyond its stack.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+# app.py sizes its Auth0/Cosmos executors and Cosmos connection pool from this same variable
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+# Import the app (logging config, JSON provider, HTTP sessions) once in the master and fork
+# it copy-on-write into the workers; post_fork below gives each worker fresh connections
+preload_app = True
+
+# With gthread this is the worker heartbeat: the master restarts a worker whose main loop
+# has not checked in for this long. It does not limit individual requests; those are
+# bounded by the 30s GitHub timeout and app.py's Cosmos retry settings.
+timeout = 60
+# Let clients reuse their connection between requests
+keepalive = 5
+
+
+def on_starting(server):
+    # Create the Cosmos database/container once per deploy, in the master, instead of
+    # on the request path of every worker. Set COSMOS_PROVISION_ON_START=0 to skip it
+    # (local dev, or when provisioning runs via "flask --app app provision-cosmos").
+    if os.getenv("COSMOS_PROVISION_ON_START", "1") == "0":
+        return
+    import app
+    try:
+        app.provision_cosmos()
+    except Exception:
+        # Still serve: Cosmos may be briefly unreachable, and the container usually exists
+        server.log.exception("Cosmos DB provisioning failed; starting without it")
+
+
+def post_fork(server, worker):
+    # Each worker must own its Cosmos client and HTTP pools; sockets shared across
+    # fork() get interleaved between processes. The log listener thread does not
+    # survive fork() either.
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.start_log_listener()
+        app_module.reset_connections()
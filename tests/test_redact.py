@@ -0,0 +1,46 @@
+import logging
+import unittest
+
+from app import RedactFilter, _redact
+
+
+class RedactTest(unittest.TestCase):
+
+    def test_email(self):
+        self.assertEqual(_redact("user bob.smith@example.com exists"), "user <email> exists")
+
+    def test_bearer_token(self):
+        self.assertEqual(_redact("{'Authorization': 'Bearer xyz.abc'}"), "{'Authorization': '<redacted>'}")
+
+    def test_github_token_scheme(self):
+        self.assertEqual(_redact("Authorization: token ghp_abc"), "Authorization: <redacted>")
+
+    def test_basic_credentials(self):
+        self.assertEqual(_redact("authorization=Basic dXNlcjpwYXNz"), "authorization=<redacted>")
+
+    def test_client_secret_in_query_string(self):
+        self.assertEqual(_redact("client_secret=abc&grant_type=x"), "client_secret=<redacted>&grant_type=x")
+
+    def test_client_secret_in_json(self):
+        self.assertEqual(_redact('{"client_secret": "abc", "audience": "x"}'),
+                         '{"client_secret": "<redacted>", "audience": "x"}')
+
+
+class RedactFilterTest(unittest.TestCase):
+
+    def make_record(self, msg, *args):
+        return logging.LogRecord("test", logging.WARNING, __file__, 1, msg, args, None)
+
+    def test_redacts_formatted_message(self):
+        record = self.make_record("invited %s", "a@b.io")
+        self.assertTrue(RedactFilter().filter(record))
+        self.assertEqual(record.getMessage(), "invited <email>")
+
+    def test_mismatched_args_do_not_raise(self):
+        record = self.make_record("bad %s %s", 1)
+        self.assertTrue(RedactFilter().filter(record))
+        self.assertEqual(record.args, (1,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+import orjson
+
+import app
+
+
+class FakeContainer:
+    """Answers the /retrieve-all scan from a fixed item list and counts the scans."""
+
+    def __init__(self, items, on_query=None):
+        self.items = items
+        self.on_query = on_query
+        self.scans = 0
+
+    def query_items(self, **kwargs):
+        self.scans += 1
+        if self.on_query:
+            self.on_query()
+        return iter(self.items)
+
+
+class RetrieveAllCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.max_bytes = app.RETRIEVE_ALL_CACHE_MAX_BYTES
+        self.container = app._container
+        app.invalidate_retrieve_all()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.RETRIEVE_ALL_CACHE_MAX_BYTES = self.max_bytes
+        app._container = self.container
+        app.invalidate_retrieve_all()
+
+    def use_container(self, items, on_query=None):
+        app._container = FakeContainer(items, on_query)
+        return app._container
+
+    def test_cache_hit_skips_scan(self):
+        container = self.use_container([{"id": "a"}, {"id": "b"}])
+        first = self.client.get("/retrieve-all")
+        second = self.client.get("/retrieve-all")
+        self.assertEqual(container.scans, 1)
+        self.assertEqual(orjson.loads(second.data), [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        self.use_container([{"id": "a"}])
+        etag = self.client.get("/retrieve-all").headers["ETag"]
+        response = self.client.get("/retrieve-all", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+    def test_body_over_cap_is_streamed_and_marked_too_large(self):
+        app.RETRIEVE_ALL_CACHE_MAX_BYTES = 64
+        items = [{"id": str(i), "pad": "x" * 20} for i in range(10)]
+        container = self.use_container(items)
+        first = self.client.get("/retrieve-all")
+        self.assertEqual(orjson.loads(first.data), items)
+        self.assertNotIn("ETag", first.headers)
+        self.assertIs(app._retrieve_all_cache.get(app.RETRIEVE_ALL_CACHE_KEY), app.RETRIEVE_ALL_TOO_LARGE)
+        second = self.client.get("/retrieve-all")
+        self.assertEqual(orjson.loads(second.data), items)
+        self.assertEqual(container.scans, 2)
+
+    def test_write_during_scan_is_not_cached(self):
+        container = self.use_container([{"id": "a"}], on_query=app.invalidate_retrieve_all)
+        response = self.client.get("/retrieve-all")
+        self.assertEqual(orjson.loads(response.data), [{"id": "a"}])
+        self.assertIsNone(app._retrieve_all_cache.get(app.RETRIEVE_ALL_CACHE_KEY))
+        container.on_query = None
+        self.client.get("/retrieve-all")
+        self.assertEqual(container.scans, 2)
+
+    def test_concurrent_misses_share_one_scan(self):
+        container = self.use_container([{"id": "a"}], on_query=lambda: time.sleep(0.2))
+        statuses = []
+
+        def fetch():
+            statuses.append(app.app.test_client().get("/retrieve-all").status_code)
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [200] * 4)
+        self.assertEqual(container.scans, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()